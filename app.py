@@ -1,12 +1,44 @@
+import copy
+import gzip
+import hashlib
+import html
 import json
 import os
+import string
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import requests
 import streamlit as st
-from openai import OpenAI
+
+# orjson이 있으면 사용(빠름), 없으면 표준 json으로 동작
+try:
+    import orjson
+
+    def _json_loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+    def _json_dumps_line(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
+
+    def _json_loads(data: Any) -> Any:
+        return json.loads(data)
+
+    def _json_dumps_line(obj: Any) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# openai/requests는 무거워서 실제로 호출할 때 import (첫 화면 표시를 늦추지 않게)
+if TYPE_CHECKING:
+    import requests
+    from openai import OpenAI
 
 
 # =========================
@@ -14,13 +46,29 @@ from openai import OpenAI
 # =========================
 APP_NAME = "MoodPick (무드픽)"
 APP_TAGLINE = "기분과 상황만 고르면, 오늘의 선택을 대신해주는 감성 추천 앱"
-HISTORY_FILE = Path(__file__).with_name("moodpick_history.json")
+# 한 줄에 항목 1개(JSON Lines, gzip 압축) — 저장은 append만, 최신 항목이 파일 끝
+# gzip은 멤버를 이어 붙여도 하나의 스트림으로 읽히므로 항목마다 append 가능
+HISTORY_FILE = Path(__file__).with_name("moodpick_history.jsonl.gz")
+LEGACY_HISTORY_FILE = Path(__file__).with_name("moodpick_history.json")
+LEGACY_JSONL_HISTORY_FILE = Path(__file__).with_name("moodpick_history.jsonl")
+# 파일에 남기는 최대 항목 수(읽을 때도 이만큼만 파싱)
+# 줄 수가 2배를 넘으면 최근 MAX_HISTORY개만 남기고 다시 씀, 그 전까지는 append만
+MAX_HISTORY = 200
 
 MOODS = ["피곤함", "우울함", "설렘", "무기력"]
 WEATHERS = ["맑음", "비", "흐림"]
 VIBES = ["혼자", "친구와", "데이트", "집에 있음"]
 TIME_BUDGETS = ["짧게", "보통", "여유 있음"]
 
+# 사이드바 TMDB 옵션 — 선택지/라벨/인덱스는 rerun마다 만들지 않고 한 번만
+TMDB_CONTENT_MODES = ["both", "movie", "tv"]
+TMDB_CONTENT_MODE_LABELS = {"both": "영화/TV 둘 다", "movie": "영화", "tv": "TV"}
+TMDB_LANGUAGES = ["ko-KR", "en-US", "ja-JP"]
+TMDB_REGIONS = ["KR", "US", "JP"]
+_TMDB_CONTENT_MODE_INDEX = {v: i for i, v in enumerate(TMDB_CONTENT_MODES)}
+_TMDB_LANGUAGE_INDEX = {v: i for i, v in enumerate(TMDB_LANGUAGES)}
+_TMDB_REGION_INDEX = {v: i for i, v in enumerate(TMDB_REGIONS)}
+
 THEME = {
     "mood": {
         "피곤함": {"emoji": "😮‍💨", "accent": "#6B7280"},
@@ -33,32 +81,277 @@ THEME = {
     "time": {"짧게": {"emoji": "⏱️"}, "보통": {"emoji": "🕒"}, "여유 있음": {"emoji": "🗓️"}},
 }
 
+# 렌더링 때마다 THEME[...].get(..., {}).get(...) 두 번씩 찾지 않도록 평탄화
+_MOOD_EMOJI = {k: v["emoji"] for k, v in THEME["mood"].items()}
+_MOOD_ACCENT = {k: v["accent"] for k, v in THEME["mood"].items()}
+_WEATHER_EMOJI = {k: v["emoji"] for k, v in THEME["weather"].items()}
+_VIBE_EMOJI = {k: v["emoji"] for k, v in THEME["vibe"].items()}
+_TIME_EMOJI = {k: v["emoji"] for k, v in THEME["time"].items()}
+
+_MT_LABEL = {"movie": "영화", "tv": "TV", "person": "인물"}
+
 DEFAULT_MODEL = "gpt-4o-2024-08-06"
 
+# 같은 입력(기분/날씨/상황/시간/추가 제약/모델)이면 OpenAI를 다시 부르지 않고 재사용
+OPENAI_CACHE_TTL = 24 * 3600
+OPENAI_CACHE_MAX_ENTRIES = 128
+# 응답이 멈췄을 때 기본값(10분)까지 기다리지 않도록
+OPENAI_TIMEOUT = 30.0
+OPENAI_MAX_RETRIES = 2
+# "다시 추천"은 캐시를 건너뛰고, 매번 다른 결과가 나오도록 온도를 조금 높임
+REROLL_TEMPERATURE = 1.1
+
 TMDB_BASE = "https://api.themoviedb.org/3"
-TMDB_IMG = "https://image.tmdb.org/t/p/w500"
+# 포스터는 카드 안 1/4 폭(약 180px 이하) 썸네일로만 쓰므로 w500 대신 w185
+TMDB_IMG = "https://image.tmdb.org/t/p/w185"
+# TMDB rate limit(약 40 req / 10s)을 넘지 않도록 동시 요청 수 제한
+TMDB_MAX_WORKERS = 8
+# Discover 결과는 몇 시간 단위로는 거의 안 바뀜 → 디스크에 저장해서 재시작 후에도 재사용
+TMDB_DISCOVER_CACHE_TTL = 6 * 3600
+TMDB_DISCOVER_CACHE_DIR = Path(__file__).with_name(".moodpick_cache") / "tmdb_discover"
+# 검색 결과(키워드 → 작품)는 하루 단위로 재사용, 키워드 종류가 많아서 항목 수는 넉넉히
+TMDB_SEARCH_CACHE_TTL = 24 * 3600
+# 응답 캐시가 만료돼도 ETag가 같으면 304로 본문 없이 재사용(Discover 전용 — 검색은 캐시 TTL이 같아서 효과 없음)
+TMDB_ETAG_TTL = 24 * 3600
+TMDB_ETAG_MAX_ENTRIES = 512
 
 
 # =========================
 # Utilities: History
 # =========================
-def load_history() -> List[Dict[str, Any]]:
-    if not HISTORY_FILE.exists():
-        return []
+def _migrate_legacy_history() -> None:
+    # 예전 형식을 압축 JSONL(최신이 뒤)로 1회 변환
+    # - moodpick_history.jsonl: 압축만 안 된 JSONL → 그대로 압축
+    # - moodpick_history.json: 전체를 JSON 배열로 저장, 최신이 앞
+    if HISTORY_FILE.exists():
+        return
+    if LEGACY_JSONL_HISTORY_FILE.exists():
+        try:
+            data = LEGACY_JSONL_HISTORY_FILE.read_bytes()
+        except Exception:
+            return
+        tmp = HISTORY_FILE.with_suffix(HISTORY_FILE.suffix + ".tmp")
+        tmp.write_bytes(gzip.compress(data))
+        os.replace(tmp, HISTORY_FILE)
+        LEGACY_JSONL_HISTORY_FILE.unlink(missing_ok=True)
+        return
+    if not LEGACY_HISTORY_FILE.exists():
+        return
     try:
-        return json.loads(HISTORY_FILE.read_text(encoding="utf-8"))
+        items = _json_loads(LEGACY_HISTORY_FILE.read_bytes())
     except Exception:
+        return
+    save_history(list(reversed(items)) if isinstance(items, list) else [])
+    LEGACY_HISTORY_FILE.unlink(missing_ok=True)
+
+
+def _recover_history_lines() -> List[bytes]:
+    """
+    깨진 gzip 멤버(쓰다 끊긴 append)를 건너뛰고 읽을 수 있는 멤버의 줄만 모음
+    - 멤버 단위로 풀다가 실패하면 다음 gzip 헤더(1f 8b 08)부터 다시 시도
+    - 깨진 멤버 뒤에 추가된 항목도 살림(파일 전체를 메모리에 올리는 건 복구할 때만)
+    """
+    data = HISTORY_FILE.read_bytes()
+    lines: List[bytes] = []
+    pos = 0
+    while pos < len(data):
+        d = zlib.decompressobj(wbits=31)  # gzip 헤더/CRC 포함
+        try:
+            chunk: Optional[bytes] = d.decompress(data[pos:])
+        except zlib.error:
+            chunk = None
+        if chunk is None or not d.eof:
+            # 깨졌거나 끝까지 안 써진 멤버 → 다음 멤버 헤더로 건너뜀(이 멤버의 일부 줄은 버림)
+            pos = data.find(b"\x1f\x8b\x08", pos + 1)
+            if pos < 0:
+                break
+            continue
+        lines.extend(chunk.splitlines(keepends=True))
+        pos = len(data) - len(d.unused_data)
+    return lines
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _load_history_cached(mtime_ns: int) -> Tuple[int, List[Dict[str, Any]], bool]:
+    # mtime_ns가 캐시 키 → 파일이 바뀌면 자동으로 다시 읽음(ttl 없이 최근 버전만 보관)
+    # 파일 전체를 메모리에 올리지 않고 한 줄씩 풀면서 마지막 N줄만 남김
+    # 반환: (파일 전체 줄 수, 최신순 항목, 중간에 깨진 멤버가 있었는지)
+    lines: "deque[bytes]" = deque(maxlen=MAX_HISTORY)
+    total = 0
+    damaged = False
+    try:
+        with gzip.open(HISTORY_FILE, "rb") as f:
+            for line in f:
+                lines.append(line)
+                total += 1
+    except (OSError, EOFError, zlib.error):
+        # 쓰다 끊긴 멤버 → 거기서 멈추지 않고 멤버 단위로 다시 읽어서 뒤에 추가된 항목까지 살림
+        damaged = True
+        recovered = _recover_history_lines()
+        total = len(recovered)
+        lines = deque(recovered, maxlen=MAX_HISTORY)
+
+    items = []
+    for line in reversed(lines):  # 최신 항목이 앞으로 오도록
+        if not line.strip():
+            continue
+        try:
+            items.append(_json_loads(line))
+        except ValueError:
+            continue  # 쓰다 끊긴 줄은 건너뜀
+    return total, items, damaged
+
+
+def load_history() -> List[Dict[str, Any]]:
+    _migrate_legacy_history()
+    if not HISTORY_FILE.exists():
         return []
+    _, items, damaged = _load_history_cached(HISTORY_FILE.stat().st_mtime_ns)
+    if damaged:
+        # 깨진 멤버가 남아 있으면 매번 복구 경로로 읽게 되므로 읽을 수 있는 항목으로 다시 씀
+        with _get_history_lock():
+            items = _rewrite_history_if_needed()
+    return items
 
 
 def save_history(items: List[Dict[str, Any]]) -> None:
-    HISTORY_FILE.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 전체 다시 쓰기(오래된 항목 → 최신 항목 순서)
+    # 임시 파일에 다 쓴 뒤 교체 → 쓰는 도중 중단돼도 기존 파일이 깨지지 않음
+    tmp = HISTORY_FILE.with_suffix(HISTORY_FILE.suffix + ".tmp")
+    tmp.write_bytes(gzip.compress(b"".join(_json_dumps_line(item) for item in items)))
+    os.replace(tmp, HISTORY_FILE)
+
+
+@st.cache_resource(show_spinner=False)
+def _get_history_lock() -> threading.Lock:
+    # 세션(스레드)끼리 히스토리 쓰기를 직렬화 — append와 정리(전체 다시 쓰기)가 섞이지 않게
+    return threading.Lock()
+
+
+def _rewrite_history_if_needed() -> List[Dict[str, Any]]:
+    """
+    잠금을 잡은 상태에서 호출 — 파일을 다시 읽고 필요하면 전체 다시 쓰기
+    - 줄 수가 2배를 넘으면 오래된 항목 정리(가끔만 일어나는 전체 다시 쓰기)
+    - 깨진 멤버가 있으면 읽을 수 있는 항목만으로 다시 씀
+    - 방금 읽은 파일 기준으로 쓰므로 다른 세션이 추가한 항목이 사라지지 않음
+    """
+    if not HISTORY_FILE.exists():
+        return []
+    total, items, damaged = _load_history_cached(HISTORY_FILE.stat().st_mtime_ns)
+    if damaged or total > 2 * MAX_HISTORY:
+        save_history(list(reversed(items)))
+    return items
 
 
 def add_history_entry(entry: Dict[str, Any]) -> None:
-    history = load_history()
-    history.insert(0, entry)
-    save_history(history)
+    # 기존 내용을 다시 쓰지 않고 한 줄만 gzip 멤버로 추가
+    with _get_history_lock():
+        with HISTORY_FILE.open("ab") as f:
+            f.write(gzip.compress(_json_dumps_line(entry)))
+        # 다음 렌더링도 같은 mtime으로 읽으므로 캐시 적중
+        _rewrite_history_if_needed()
+
+
+def clear_history() -> None:
+    with _get_history_lock():
+        HISTORY_FILE.unlink(missing_ok=True)
+
+
+# =========================
+# Utilities: In-memory Cache
+# =========================
+class TTLCache:
+    """
+    프로세스 공용 TTL + LRU 캐시 (st.cache_resource로 하나만 만들어 세션 간 공유)
+    - st.cache_data는 함수 안에서 그린 요소(스트리밍 미리보기)를 다시 재생하려고 해서
+      렌더링을 곁들이는 호출에는 쓸 수 없음 → 값 저장/조회만 직접 관리
+    - 저장/반환 시 deepcopy → 호출한 쪽에서 값을 바꿔도 캐시는 그대로
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                return None
+            saved_at, value = hit
+            if time.monotonic() - saved_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), copy.deepcopy(value))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+class DiskTTLCache:
+    """
+    디스크 TTL 캐시(재시작/재배포 후에도 유지) — 항목마다 gzip JSON 파일 1개
+    - 만료는 파일 수정 시각 기준, 만료된 파일은 읽을 때 삭제
+    - ttl 주기로 한 번씩 디렉터리를 훑어 만료 파일 정리 → 다시 안 읽히는 파일도 쌓이지 않음
+    - 값은 JSON으로 저장 가능한 것만
+    """
+
+    def __init__(self, directory: Path, ttl: float) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self._last_prune = float("-inf")
+        self._lock = threading.Lock()
+
+    def _path(self, key: Any) -> Path:
+        return self.directory / f"{hashlib.blake2b(_json_dumps_line(key), digest_size=16).hexdigest()}.json.gz"
+
+    def _expired(self, path: Path, now: float) -> bool:
+        try:
+            return now - path.stat().st_mtime > self.ttl
+        except FileNotFoundError:
+            return True
+
+    def get(self, key: Any) -> Optional[Any]:
+        path = self._path(key)
+        if self._expired(path, time.time()):
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            return _json_loads(gzip.decompress(path.read_bytes()))
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def set(self, key: Any, value: Any) -> None:
+        path = self._path(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # 스레드마다 다른 임시 파일에 쓴 뒤 교체(같은 키를 동시에 써도 깨지지 않음)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(gzip.compress(_json_dumps_line(value)))
+        os.replace(tmp, path)
+        self._maybe_prune()
+
+    def _maybe_prune(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._last_prune < self.ttl:
+                return
+            self._last_prune = time.monotonic()
+        now = time.time()
+        for path in self.directory.iterdir():
+            # 중간에 끊긴 임시 파일도 같은 기준으로 정리
+            if self._expired(path, now):
+                path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            path.unlink(missing_ok=True)
 
 
 # =========================
@@ -74,26 +367,25 @@ def get_secret(key_name: str) -> Optional[str]:
     return None
 
 
+def _resolve_key(name: str, session_key: str) -> Optional[str]:
+    # secrets → env → session 순서로 처음 나온 값 사용
+    for key in (get_secret(name), os.getenv(name), st.session_state.get(session_key)):
+        if isinstance(key, str) and key.strip():
+            return key.strip()
+    return None
+
+
 def get_openai_key() -> Optional[str]:
-    key = get_secret("OPENAI_API_KEY")
-    if not key:
-        key = os.getenv("OPENAI_API_KEY", "").strip() or None
-    if not key:
-        key = st.session_state.get("openai_key", None)
-    return key.strip() if isinstance(key, str) and key.strip() else None
+    return _resolve_key("OPENAI_API_KEY", "openai_key")
 
 
 def get_tmdb_key() -> Optional[str]:
-    key = get_secret("TMDB_API_KEY")
-    if not key:
-        key = os.getenv("TMDB_API_KEY", "").strip() or None
-    if not key:
-        key = st.session_state.get("tmdb_key", None)
-    return key.strip() if isinstance(key, str) and key.strip() else None
+    return _resolve_key("TMDB_API_KEY", "tmdb_key")
 
 
-def ensure_openai_key_or_stop() -> str:
-    key = get_openai_key()
+def ensure_openai_key_or_stop(key: Optional[str] = None) -> str:
+    # key: 이번 rerun에서 이미 확인한 키가 있으면 넘겨서 재조회 생략
+    key = key or get_openai_key()
     if not key:
         st.error(
             "OpenAI API Key가 필요해요.\n\n"
@@ -108,14 +400,15 @@ def ensure_openai_key_or_stop() -> str:
 # =========================
 # OpenAI: Prompt + Call
 # =========================
-def build_user_prompt(
-    mood: str,
-    weather: str,
-    vibe: str,
-    time_budget: str,
-    extra_constraints: str = "",
-) -> str:
-    base = f"""
+# 호출마다 다시 만들 필요 없는 프롬프트/스키마는 모듈 상수로 한 번만 생성
+_SYSTEM_INSTRUCTIONS = (
+    "너는 사용자의 감정과 상황을 이해하고, 과도하지 않으면서 바로 실행 가능한 "
+    "소규모 일상 활동 선택지를 제안하는 라이프스타일 추천 도우미다. "
+    "항상 3개 이내로 추천하고, 각각에 부담 없는 이유를 한 문장으로 덧붙여라. "
+    "TMDB 검색 키워드는 너무 구체적인 고유명사보다, 일반 키워드를 선호한다."
+)
+
+_BASE_PROMPT_TEMPLATE = """
 상황:
 - 현재 기분: {mood}
 - 날씨: {weather}
@@ -128,52 +421,201 @@ def build_user_prompt(
 추천은 한국어로, 너무 길지 않게.
 """.strip()
 
-    if extra_constraints.strip():
-        base += f"\n\n추가 제약/선호:\n{extra_constraints.strip()}\n"
-
-    # TMDB 검색 fallback용 키워드 (작품 제목이 아니라 분위기/장르에 가까운 일반 단어)
-    base += "\n\n추가 요청: 각 추천마다 TMDB 검색에 쓸 '검색 키워드'를 1~3개 단어(한국어 또는 영어)로 포함해줘."
-    return base
-
-
-def recommendations_json_schema() -> Dict[str, Any]:
-    return {
-        "type": "object",
-        "additionalProperties": False,
-        "properties": {
-            "headline": {"type": "string"},
-            "tone": {"type": "string"},
-            "recommendations": {
-                "type": "array",
-                "minItems": 1,
-                "maxItems": 3,
-                "items": {
-                    "type": "object",
-                    "additionalProperties": False,
-                    "properties": {
-                        "title": {"type": "string"},
-                        "one_liner": {"type": "string"},
-                        "reason": {"type": "string"},
-                        "how_to_start": {
-                            "type": "array",
-                            "minItems": 1,
-                            "maxItems": 3,
-                            "items": {"type": "string"},
-                        },
-                        "tmdb_keywords": {
-                            "type": "array",
-                            "minItems": 1,
-                            "maxItems": 3,
-                            "items": {"type": "string"},
-                            "description": "TMDB 검색용 키워드 1~3개",
-                        },
+_EXTRA_CONSTRAINTS_TEMPLATE = "\n\n추가 제약/선호:\n{extra}\n"
+
+# TMDB 검색 fallback용 키워드 (작품 제목이 아니라 분위기/장르에 가까운 일반 단어)
+_TMDB_KEYWORD_SUFFIX = "\n\n추가 요청: 각 추천마다 TMDB 검색에 쓸 '검색 키워드'를 1~3개 단어(한국어 또는 영어)로 포함해줘."
+
+_RECOMMENDATIONS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "headline": {"type": "string"},
+        "tone": {"type": "string"},
+        "recommendations": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 3,
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "title": {"type": "string"},
+                    "one_liner": {"type": "string"},
+                    "reason": {"type": "string"},
+                    "how_to_start": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": 3,
+                        "items": {"type": "string"},
+                    },
+                    "tmdb_keywords": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": 3,
+                        "items": {"type": "string"},
+                        "description": "TMDB 검색용 키워드 1~3개",
                     },
-                    "required": ["title", "one_liner", "reason", "how_to_start", "tmdb_keywords"],
                 },
+                "required": ["title", "one_liner", "reason", "how_to_start", "tmdb_keywords"],
             },
         },
-        "required": ["headline", "tone", "recommendations"],
+    },
+    "required": ["headline", "tone", "recommendations"],
+}
+
+_RESPONSE_TEXT_CONFIG: Dict[str, Any] = {
+    "format": {
+        "type": "json_schema",
+        "name": "moodpick_recommendations",
+        "schema": _RECOMMENDATIONS_SCHEMA,
+        "strict": True,
     }
+}
+
+
+def build_user_prompt(
+    mood: str,
+    weather: str,
+    vibe: str,
+    time_budget: str,
+    extra_constraints: str = "",
+) -> str:
+    base = _BASE_PROMPT_TEMPLATE.format(mood=mood, weather=weather, vibe=vibe, time_budget=time_budget)
+
+    extra = extra_constraints.strip()
+    if extra:
+        base += _EXTRA_CONSTRAINTS_TEMPLATE.format(extra=extra)
+
+    return base + _TMDB_KEYWORD_SUFFIX
+
+
+class PartialRecoParser:
+    """
+    스트리밍 중인(아직 닫히지 않은) JSON 버퍼에서 지금까지 완성된 부분만 뽑아냄
+    - feed(): 델타를 이어 붙이고 지난번에 멈춘 위치부터만 스캔(버퍼를 처음부터 다시 훑지 않음)
+    - headline/tone: 값 문자열이 닫혔을 때만
+    - recommendations: 완성된 객체만(문자열 내부의 괄호/이스케이프는 무시)
+    """
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self.recommendations: List[Dict[str, Any]] = []
+        # 스캐너 상태 — 델타 사이에 유지
+        self._pos = -1  # 다음에 볼 위치(-1: 아직 "recommendations" 배열 시작 전)
+        self._depth = 0
+        self._obj_start = -1
+        self._in_str = False
+        self._escape = False
+        self._done = False  # 배열이 닫혔거나 깨진 객체를 만남
+
+    def feed(self, delta: str) -> bool:
+        # 반환: 이번 델타로 추천 객체가 새로 완성됐는지
+        self.buffer += delta
+        if self._done:
+            return False
+        if self._pos < 0:
+            key_pos = self.buffer.find('"recommendations"')
+            if key_pos < 0:
+                return False
+            bracket = self.buffer.find("[", key_pos)
+            if bracket < 0:
+                return False
+            self._pos = bracket + 1
+
+        text = self.buffer
+        before = len(self.recommendations)
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            i += 1
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i - 1
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start >= 0:
+                    try:
+                        self.recommendations.append(json.loads(text[self._obj_start : i]))
+                    except ValueError:
+                        self._done = True
+                        break
+                    self._obj_start = -1
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                break
+        self._pos = i
+        return len(self.recommendations) > before
+
+    def partial(self) -> Dict[str, Any]:
+        partial: Dict[str, Any] = {}
+        decoder = json.JSONDecoder()
+
+        for field in ("headline", "tone"):
+            key_pos = self.buffer.find(f'"{field}"')
+            if key_pos < 0:
+                continue
+            colon = self.buffer.find(":", key_pos)
+            if colon < 0:
+                continue
+            pos = colon + 1
+            while pos < len(self.buffer) and self.buffer[pos].isspace():
+                pos += 1
+            try:
+                value, _ = decoder.raw_decode(self.buffer, pos)
+            except ValueError:
+                continue
+            if isinstance(value, str):
+                partial[field] = value
+
+        if self._pos >= 0:
+            partial["recommendations"] = list(self.recommendations)
+        return partial
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_openai_client(api_key: str) -> "OpenAI":
+    # 키별로 클라이언트 1개를 재사용 → 내부 httpx 커넥션 풀/TLS 세션 유지
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+
+
+@st.cache_resource(show_spinner=False)
+def get_reco_cache() -> TTLCache:
+    return TTLCache(ttl=OPENAI_CACHE_TTL, max_entries=OPENAI_CACHE_MAX_ENTRIES)
+
+
+def extra_digest(extra_constraints: str) -> str:
+    # 추가 제약(자유 입력)은 원문 대신 짧은 해시로 — 캐시 키/URL에 원문이 남지 않게
+    normalized = extra_constraints.strip().lower()
+    if not normalized:
+        return ""
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def reco_cache_key(
+    model: str,
+    mood: str,
+    weather: str,
+    vibe: str,
+    time_budget: str,
+    extra_key: str,
+) -> Tuple[str, ...]:
+    # API 키는 키에 넣지 않음(같은 입력이면 누가 불러도 같은 추천을 재사용)
+    # extra_key: extra_digest(추가 제약) — URL에서 복원할 때도 같은 값을 씀
+    return (model, mood, weather, vibe, time_budget, extra_key)
 
 
 def call_openai_recommendations(
@@ -184,34 +626,40 @@ def call_openai_recommendations(
     vibe: str,
     time_budget: str,
     extra_constraints: str,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+    temperature: Optional[float] = None,
 ) -> Dict[str, Any]:
-    client = OpenAI(api_key=api_key)
-
-    system_instructions = (
-        "너는 사용자의 감정과 상황을 이해하고, 과도하지 않으면서 바로 실행 가능한 "
-        "소규모 일상 활동 선택지를 제안하는 라이프스타일 추천 도우미다. "
-        "항상 3개 이내로 추천하고, 각각에 부담 없는 이유를 한 문장으로 덧붙여라. "
-        "TMDB 검색 키워드는 너무 구체적인 고유명사보다, 일반 키워드를 선호한다."
-    )
-
+    """
+    Responses API 스트리밍으로 호출
+    - on_partial: 추천 카드가 하나씩 완성될 때마다 부분 payload로 호출(진행 중 렌더링용)
+    - temperature: None이면 모델 기본값
+    """
+    client = get_openai_client(api_key)
     user_prompt = build_user_prompt(mood, weather, vibe, time_budget, extra_constraints)
 
-    resp = client.responses.create(
+    extra_kwargs: Dict[str, Any] = {}
+    if temperature is not None:
+        extra_kwargs["temperature"] = temperature
+
+    parser = PartialRecoParser()
+    with client.responses.stream(
         model=model,
         input=[
-            {"role": "system", "content": system_instructions},
+            {"role": "system", "content": _SYSTEM_INSTRUCTIONS},
             {"role": "user", "content": user_prompt},
         ],
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": "moodpick_recommendations",
-                "schema": recommendations_json_schema(),
-                "strict": True,
-            }
-        },
-    )
-    return json.loads(resp.output_text)
+        text=_RESPONSE_TEXT_CONFIG,
+        **extra_kwargs,
+    ) as stream:
+        for event in stream:
+            if event.type != "response.output_text.delta" or on_partial is None:
+                continue
+            # 카드가 새로 완성됐을 때만 다시 그림(델타마다 그리면 오히려 느려짐)
+            if parser.feed(event.delta):
+                on_partial(parser.partial())
+        resp = stream.get_final_response()
+
+    return _json_loads(resp.output_text)
 
 
 # =========================
@@ -262,18 +710,91 @@ WEATHER_GENRE_BOOST = {
 }
 
 
-def tmdb_discover(
-    api_key: str,
-    media: str,  # "movie" or "tv"
-    genres: List[int],
-    language: str = "ko-KR",
-    region: str = "KR",
-    vote_count_gte: int = 150,
-    page: int = 1,
+@st.cache_resource(show_spinner=False)
+def get_tmdb_session() -> "requests.Session":
+    """
+    TMDB 호출용 공용 Session (keep-alive로 TLS 핸드셰이크 재사용)
+    - app.py는 rerun마다 다시 실행되므로 모듈 전역 대신 cache_resource로 프로세스당 1개 유지
+    - 429/5xx는 지수 백오프로 재시도
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json"})
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"])
+    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry))
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def get_tmdb_pool() -> ThreadPoolExecutor:
+    """
+    TMDB HTTP 호출(단일 요청) 전용 공용 스레드 풀 — rerun/세션마다 스레드를 새로 만들지 않음
+    - 여기 넣은 작업은 다른 작업을 기다리지 않는 "말단" 요청만(중첩 대기로 인한 교착 방지)
+    """
+    return ThreadPoolExecutor(max_workers=TMDB_MAX_WORKERS, thread_name_prefix="tmdb")
+
+
+@st.cache_resource(show_spinner=False)
+def get_tmdb_etag_store() -> TTLCache:
+    # (endpoint, params) → (ETag, 응답 JSON) — st.cache_data가 만료된 뒤에도 304면 본문 없이 재사용
+    return TTLCache(ttl=TMDB_ETAG_TTL, max_entries=TMDB_ETAG_MAX_ENTRIES)
+
+
+def tmdb_get_json(endpoint: str, params: Dict[str, Any], use_etag: bool = True) -> Dict[str, Any]:
+    """
+    If-None-Match 조건부 GET
+    - 전에 받은 ETag가 있으면 같이 보내고, 304면 저장해둔 JSON을 그대로 반환
+    - use_etag=False: ETag를 저장/전송하지 않는 일반 GET
+    - 실패 시 예외를 그대로 던짐(호출한 쪽 캐시에 빈 결과가 남지 않게)
+    """
+    if not use_etag:
+        r = get_tmdb_session().get(endpoint, params=params, timeout=10)
+        r.raise_for_status()
+        return _json_loads(r.content)
+
+    store = get_tmdb_etag_store()
+    # api_key는 키에서 제외(키가 달라도 응답은 같음)
+    store_key = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items() if k != "api_key")))
+    hit = store.get(store_key)
+
+    headers = {"If-None-Match": hit[0]} if hit else None
+    r = get_tmdb_session().get(endpoint, params=params, headers=headers, timeout=10)
+    if r.status_code == 304 and hit:
+        return hit[1]
+    r.raise_for_status()
+    # r.json()(표준 json) 대신 원본 bytes를 _json_loads로(orjson이 있으면 orjson)
+    data = _json_loads(r.content)
+
+    etag = r.headers.get("ETag")
+    if etag:
+        store.set(store_key, (etag, data))
+    return data
+
+
+@st.cache_resource(show_spinner=False)
+def get_tmdb_discover_store() -> DiskTTLCache:
+    # st.cache_data(persist="disk")는 오래된 .memo 파일을 지우지 않음 → 만료 파일을 직접 정리하는 저장소 사용
+    return DiskTTLCache(TMDB_DISCOVER_CACHE_DIR, ttl=TMDB_DISCOVER_CACHE_TTL)
+
+
+@st.cache_data(ttl=TMDB_DISCOVER_CACHE_TTL, max_entries=512, show_spinner=False)
+def _tmdb_discover_cached(
+    _api_key: str,
+    media: str,
+    genres: Tuple[int, ...],
+    language: str,
+    region: str,
+    vote_count_gte: int,
+    page: int,
 ) -> List[Dict[str, Any]]:
+    # _api_key는 캐시 키에서 제외, 실패 시 예외를 던져서 빈 결과가 캐시되지 않게 함
+    # 메모리(st.cache_data) → 디스크(재시작 후에도 유지) → TMDB 순서로 조회
     endpoint = f"{TMDB_BASE}/discover/{media}"
     params = {
-        "api_key": api_key,
+        "api_key": _api_key,
         "language": language,
         "sort_by": "popularity.desc",
         "include_adult": "false",
@@ -285,12 +806,14 @@ def tmdb_discover(
     if region:
         params["region"] = region
 
-    try:
-        r = requests.get(endpoint, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-    except Exception:
-        return []
+    # 디스크 키는 실제 요청 파라미터 그대로(api_key 제외) → 쿼리 형식이 바뀌면 예전 파일을 쓰지 않음
+    store = get_tmdb_discover_store()
+    store_key = [endpoint, sorted((k, str(v)) for k, v in params.items() if k != "api_key")]
+    hit = store.get(store_key)
+    if hit is not None:
+        return hit
+
+    data = tmdb_get_json(endpoint, params)
 
     results = []
     for item in (data.get("results") or []):
@@ -307,21 +830,46 @@ def tmdb_discover(
                 "id": item.get("id"),
             }
         )
+    store.set(store_key, results)
     return results
 
 
-def tmdb_search_multi(api_key: str, query: str, language: str = "ko-KR") -> List[Dict[str, Any]]:
+def tmdb_discover(
+    api_key: str,
+    media: str,  # "movie" or "tv"
+    genres: List[int],
+    language: str = "ko-KR",
+    region: str = "KR",
+    vote_count_gte: int = 150,
+    page: int = 1,
+) -> List[Dict[str, Any]]:
+    # 장르 순서가 달라도 같은 캐시 항목을 쓰도록 정렬된 tuple로(with_genres는 순서 무관)
     try:
-        r = requests.get(
-            f"{TMDB_BASE}/search/multi",
-            params={"api_key": api_key, "query": query, "language": language, "include_adult": "false"},
-            timeout=10,
+        return _tmdb_discover_cached(
+            api_key,
+            media,
+            tuple(sorted(genres)),
+            language,
+            region,
+            vote_count_gte,
+            page,
         )
-        r.raise_for_status()
-        data = r.json()
     except Exception:
         return []
 
+
+@st.cache_data(ttl=TMDB_SEARCH_CACHE_TTL, max_entries=4096, show_spinner=False)
+def _tmdb_search_cached(_api_key: str, query: str, language: str) -> List[Dict[str, Any]]:
+    # _api_key는 캐시 키에서 제외(키가 달라도 검색 결과는 같음)
+    # 실패 시 예외를 그대로 던져서 빈 결과가 캐시되지 않게 함
+    # 키워드가 LLM 자유 출력이라 종류가 끝이 없음 → 디스크에 남기지 않고 메모리(ttl + max_entries)로만
+    # ETag 저장소는 TTL이 같고 더 작아서 이 캐시가 만료될 땐 ETag도 이미 없음 → 저장하지 않음(Discover 항목만 밀려남)
+    data = tmdb_get_json(
+        f"{TMDB_BASE}/search/multi",
+        {"api_key": _api_key, "query": query, "language": language, "include_adult": "false"},
+        use_etag=False,
+    )
+
     results = []
     for item in (data.get("results") or []):
         media_type = item.get("media_type")
@@ -343,6 +891,35 @@ def tmdb_search_multi(api_key: str, query: str, language: str = "ko-KR") -> List
     return results
 
 
+def tmdb_search_multi(api_key: str, query: str, language: str = "ko-KR") -> List[Dict[str, Any]]:
+    # 공백/대소문자만 다른 검색어는 같은 캐시 항목을 쓰도록 정규화(TMDB 검색은 대소문자 무시)
+    query = " ".join(query.split()).lower()
+    if not query:
+        return []
+    try:
+        return _tmdb_search_cached(api_key, query, language)
+    except Exception:
+        return []
+
+
+def clear_tmdb_caches() -> None:
+    # 디스크에 남은 Discover 캐시까지 포함해서 TMDB 관련 캐시 전부 비움
+    _tmdb_discover_cached.clear()
+    get_tmdb_discover_store().clear()
+    _tmdb_search_cached.clear()
+    get_tmdb_etag_store.clear()
+    st.session_state.tmdb_prefetch = None
+    st.session_state.tmdb_last_render = None
+
+
+def tmdb_search_multi_langs(api_key: str, query: str, languages: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    # 언어별 검색을 순서대로 기다리지 않고 동시에 보냄(결과는 languages 순서대로 이어 붙임)
+    if len(languages) == 1:
+        return tmdb_search_multi(api_key, query, language=languages[0])
+    futures = [get_tmdb_pool().submit(tmdb_search_multi, api_key, query, lang) for lang in languages]
+    return [item for f in futures for item in f.result()]
+
+
 def build_weighted_genre_lists(mood: str, vibe: str, weather: str) -> Tuple[List[int], List[int]]:
     """
     primary, secondary 장르 리스트 생성
@@ -355,21 +932,11 @@ def build_weighted_genre_lists(mood: str, vibe: str, weather: str) -> Tuple[List
     boosts += VIBE_GENRE_BOOST.get(vibe, [])
     boosts += WEATHER_GENRE_BOOST.get(weather, [])
 
-    # primary는 base_primary + boosts(중복 제거)
-    primary = []
-    seen = set()
-    for g in (base_primary + boosts):
-        if g not in seen:
-            seen.add(g)
-            primary.append(g)
-
-    # secondary는 base_secondary + (base_primary 일부) + boosts 일부 (중복 제거)
-    secondary = []
-    seen2 = set()
-    for g in (base_secondary + base_primary + boosts):
-        if g not in seen2:
-            seen2.add(g)
-            secondary.append(g)
+    # primary는 base_primary + boosts(중복 제거, 순서 유지)
+    primary = list(dict.fromkeys(base_primary + boosts))
+
+    # secondary는 base_secondary + (base_primary 일부) + boosts 일부 (중복 제거, 순서 유지)
+    secondary = list(dict.fromkeys(base_secondary + base_primary + boosts))
 
     return primary, secondary
 
@@ -378,7 +945,10 @@ def dedupe_items(items: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]
     out = []
     seen = set()
     for x in items:
-        key = (x.get("media_type"), x.get("id"))
+        # 제목은 리메이크끼리 겹치므로 id 기준, id가 없을 때만 제목으로 대신함
+        # (id 없는 항목끼리 (media_type, None) 하나로 뭉쳐서 사라지지 않게)
+        mid = x.get("id")
+        key = (x.get("media_type"), mid) if mid else (x.get("media_type"), "title", x.get("title"))
         if key in seen:
             continue
         seen.add(key)
@@ -388,23 +958,37 @@ def dedupe_items(items: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]
     return out
 
 
-def tmdb_get_recommendations_weighted(
+def _collect_until_full(
+    futures: List["Future[List[Dict[str, Any]]]"],
+    collected: List[Dict[str, Any]],
+    n_items: int,
+) -> List[Dict[str, Any]]:
+    # media_list 순서대로 결과를 합치다가 개수가 차면 바로 반환
+    # (아직 시작 안 한 요청은 취소 → 풀 자리 양보)
+    for idx, f in enumerate(futures):
+        collected = dedupe_items(collected + f.result(), limit=n_items)
+        if len(collected) >= n_items:
+            for rest in futures[idx + 1 :]:
+                rest.cancel()
+            break
+    return collected
+
+
+def tmdb_discover_weighted(
     api_key: str,
     content_mode: str,  # "movie" | "tv" | "both"
     mood: str,
     vibe: str,
     weather: str,
-    fallback_query: str,
     language: str,
     region: str,
     vote_count_gte: int,
     n_items: int,
-    use_search_fallback: bool,
 ) -> List[Dict[str, Any]]:
     """
     1) Discover-first (primary genres)
     2) 부족하면 Discover (secondary genres)
-    3) still 부족하면 Search fallback (ko→en)
+    - LLM 추천 내용과 무관 → OpenAI 호출과 동시에 미리 받아둘 수 있음
     """
     primary, secondary = build_weighted_genre_lists(mood, vibe, weather)
 
@@ -416,9 +1000,12 @@ def tmdb_get_recommendations_weighted(
 
     collected: List[Dict[str, Any]] = []
 
-    # 1) primary discover
-    for media in media_list:
-        collected += tmdb_discover(
+    pool = get_tmdb_pool()
+
+    # 1) primary discover (movie/tv 동시에, 결과는 media_list 순서대로)
+    futures = [
+        pool.submit(
+            tmdb_discover,
             api_key=api_key,
             media=media,
             genres=primary,
@@ -427,15 +1014,16 @@ def tmdb_get_recommendations_weighted(
             vote_count_gte=vote_count_gte,
             page=1,
         )
-
-    collected = dedupe_items(collected, limit=n_items)
+        for media in media_list
+    ]
+    collected = _collect_until_full(futures, collected, n_items)
     if len(collected) >= n_items:
         return collected
 
     # 2) secondary discover
-    more: List[Dict[str, Any]] = []
-    for media in media_list:
-        more += tmdb_discover(
+    futures = [
+        pool.submit(
+            tmdb_discover,
             api_key=api_key,
             media=media,
             genres=secondary,
@@ -444,15 +1032,49 @@ def tmdb_get_recommendations_weighted(
             vote_count_gte=max(0, vote_count_gte - 50),  # 조금 완화
             page=1,
         )
-    collected = dedupe_items(collected + more, limit=n_items)
+        for media in media_list
+    ]
+    return _collect_until_full(futures, collected, n_items)
+
+
+def tmdb_get_recommendations_weighted(
+    api_key: str,
+    content_mode: str,  # "movie" | "tv" | "both"
+    mood: str,
+    vibe: str,
+    weather: str,
+    fallback_query: str,
+    language: str,
+    region: str,
+    vote_count_gte: int,
+    n_items: int,
+    use_search_fallback: bool,
+    discovered: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    1~2) Discover (tmdb_discover_weighted, discovered로 미리 받아둔 결과를 넘기면 재사용)
+    3) still 부족하면 Search fallback (ko→en)
+    """
+    if discovered is None:
+        discovered = tmdb_discover_weighted(
+            api_key=api_key,
+            content_mode=content_mode,
+            mood=mood,
+            vibe=vibe,
+            weather=weather,
+            language=language,
+            region=region,
+            vote_count_gte=vote_count_gte,
+            n_items=n_items,
+        )
+    collected = dedupe_items(discovered, limit=n_items)
     if len(collected) >= n_items:
         return collected
 
     # 3) Search fallback
     if use_search_fallback:
-        searched = tmdb_search_multi(api_key, fallback_query, language=language)
-        if language != "en-US":
-            searched += tmdb_search_multi(api_key, fallback_query, language="en-US")
+        languages = (language,) if language == "en-US" else (language, "en-US")
+        searched = tmdb_search_multi_langs(api_key, fallback_query, languages)
         collected = dedupe_items(collected + searched, limit=n_items)
 
     return collected
@@ -461,175 +1083,595 @@ def tmdb_get_recommendations_weighted(
 # =========================
 # UI Helpers
 # =========================
-def apply_dynamic_style(accent_hex: str) -> None:
-    st.markdown(
-        f"""
+# 무드와 상관없는 스타일 — accent는 CSS 변수로만 참조
+_STATIC_CSS = """
+<link rel="preconnect" href="https://image.tmdb.org">
 <style>
-:root {{
-  --moodpick-accent: {accent_hex};
-}}
-div.stButton > button {{
+div.stButton > button, div.stFormSubmitButton > button {
   border: 1px solid rgba(0,0,0,0.08);
-}}
-div.stButton > button:hover {{
+}
+div.stButton > button:hover, div.stFormSubmitButton > button:hover {
   border-color: var(--moodpick-accent);
-}}
-.moodpick-card {{
+}
+.moodpick-card {
   border: 1px solid rgba(0,0,0,0.08);
   border-left: 6px solid var(--moodpick-accent);
   border-radius: 14px;
   padding: 14px 14px 12px 14px;
   margin: 10px 0px;
   background: rgba(0,0,0,0.015);
-}}
-.moodpick-title {{
+}
+.moodpick-title {
   font-size: 1.05rem;
   font-weight: 700;
   margin-bottom: 6px;
-}}
-.moodpick-sub {{
+}
+.moodpick-sub {
   color: rgba(0,0,0,0.70);
   margin-bottom: 10px;
-}}
-.moodpick-reason {{
+}
+.moodpick-reason {
   color: rgba(0,0,0,0.78);
   margin-bottom: 10px;
-}}
-.moodpick-chip {{
+}
+.moodpick-chip {
   display: inline-block;
   padding: 4px 10px;
   border-radius: 999px;
   background: rgba(0,0,0,0.05);
   margin-right: 6px;
   font-size: 0.85rem;
-}}
-.tmdb-row {{
+}
+.tmdb-row {
   border-top: 1px dashed rgba(0,0,0,0.12);
   margin-top: 10px;
   padding-top: 10px;
-}}
+}
+.tmdb-list {
+  display: flex;
+  flex-direction: column;
+}
+.tmdb-item {
+  display: flex;
+  gap: 12px;
+  margin-bottom: 12px;
+}
+.tmdb-poster {
+  flex: 0 0 25%;
+  max-width: 25%;
+}
+.tmdb-poster img {
+  width: 100%;
+  border-radius: 8px;
+}
+.tmdb-noposter {
+  color: rgba(0,0,0,0.55);
+  font-size: 0.85rem;
+}
+.tmdb-meta {
+  flex: 1;
+}
+.tmdb-overview {
+  color: rgba(0,0,0,0.60);
+  font-size: 0.85rem;
+  margin-top: 4px;
+}
 </style>
-""",
-        unsafe_allow_html=True,
-    )
+"""
+
+# 무드마다 바뀌는 건 accent 변수 하나뿐
+_ACCENT_CSS_TEMPLATE = string.Template("<style>:root { --moodpick-accent: $accent; }</style>")
+
+
+def apply_dynamic_style(accent_hex: str) -> None:
+    # rerun마다 화면을 새로 그리므로 둘 다 매번 출력해야 유지됨
+    # 정적 블록은 내용이 항상 같아서 프런트엔드에서 다시 바뀌지 않고, 무드가 바뀌면 작은 accent 블록만 달라짐
+    st.markdown(_STATIC_CSS, unsafe_allow_html=True)
+    st.markdown(_ACCENT_CSS_TEMPLATE.substitute(accent=accent_hex), unsafe_allow_html=True)
+
+
+_TMDB_ITEM_TEMPLATE = string.Template(
+    """<div class="tmdb-item">
+  <div class="tmdb-poster">$poster</div>
+  <div class="tmdb-meta"><b>$title</b>  ·  $mt_label<div class="tmdb-overview">$overview</div></div>
+</div>"""
+)
+_TMDB_POSTER_TEMPLATE = string.Template('<img src="$src" alt="$alt" $load_attrs decoding="async" referrerpolicy="no-referrer"/>')
+_TMDB_NO_POSTER = '<div class="tmdb-noposter">포스터 없음</div>'
 
 
-def render_tmdb_items(items: List[Dict[str, Any]]) -> None:
+def render_tmdb_items(items: List[Dict[str, Any]], priority: bool = False) -> None:
+    # priority: 첫 카드(화면 맨 위)의 첫 포스터는 lazy 대신 우선 다운로드, 나머지는 보일 때 로딩
     if not items:
         st.caption("TMDB에서 추천을 가져오지 못했어요(키/네트워크/설정 확인).")
         return
 
+    # 아이템마다 columns/image/caption을 따로 그리지 않고 HTML 한 덩어리로 한 번에 출력
+    rows = []
+    eager = priority
     for item in items:
-        cols = st.columns([1, 3], gap="small")
-        with cols[0]:
-            if item.get("poster_url"):
-                st.image(item["poster_url"], use_container_width=True)
-            else:
-                st.caption("포스터 없음")
-        with cols[1]:
-            mt = item.get("media_type", "")
-            mt_label = {"movie": "영화", "tv": "TV"}.get(mt, mt)
-            st.markdown(f"**{item.get('title','Untitled')}**  ·  {mt_label}")
-            overview = item.get("overview") or ""
-            if overview:
-                st.caption(overview[:220] + ("…" if len(overview) > 220 else ""))
-            else:
-                st.caption("요약이 없어요.")
+        mt = item.get("media_type", "")
+        mt_label = _MT_LABEL.get(mt, mt)
+        title = html.escape(item.get("title") or "Untitled")
+        overview = item.get("overview") or ""
+        if overview:
+            # 잘릴 때만 "…"를 붙임(짧은 요약은 슬라이스/이어붙이기 없이 그대로 escape)
+            if len(overview) > 220:
+                overview = f"{overview[:220].rstrip()}…"
+            overview = html.escape(overview)
+        else:
+            overview = "요약이 없어요."
+        if item.get("poster_url"):
+            poster = _TMDB_POSTER_TEMPLATE.substitute(
+                src=html.escape(item["poster_url"]),
+                alt=title,
+                load_attrs='fetchpriority="high"' if eager else 'loading="lazy"',
+            )
+            eager = False
+        else:
+            poster = _TMDB_NO_POSTER
+        rows.append(_TMDB_ITEM_TEMPLATE.substitute(poster=poster, title=title, mt_label=html.escape(mt_label), overview=overview))
+    st.markdown(f'<div class="tmdb-list">{"".join(rows)}</div>', unsafe_allow_html=True)
+
+
+def tmdb_discover_args(mood: str, vibe: str, weather: str) -> Dict[str, Any]:
+    # 현재 사이드바 TMDB 설정 기준 Discover 인자(미리 받아둔 결과를 재사용해도 되는지 비교할 때도 사용)
+    return {
+        "content_mode": st.session_state.tmdb_content_mode,
+        "mood": mood,
+        "vibe": vibe,
+        "weather": weather,
+        "language": st.session_state.tmdb_language,
+        "region": st.session_state.tmdb_region,
+        "vote_count_gte": int(st.session_state.tmdb_vote_count_gte),
+        "n_items": int(st.session_state.tmdb_n_items),
+    }
 
 
-def render_reco_cards(
-    reco_payload: Dict[str, Any],
+def build_current_inputs(
     mood: str,
     weather: str,
     vibe: str,
     time_budget: str,
+    extra: str,
+    model: str,
     tmdb_key: Optional[str],
+) -> Dict[str, Any]:
+    # 히스토리에 함께 저장되는 입력값(현재 사이드바 TMDB 설정 포함)
+    return {
+        "mood": mood,
+        "weather": weather,
+        "vibe": vibe,
+        "time_budget": time_budget,
+        "extra_constraints": extra,
+        "model": model,
+        "tmdb_enabled": bool(tmdb_key),
+        "tmdb_content_mode": st.session_state.tmdb_content_mode,
+        "tmdb_language": st.session_state.tmdb_language,
+        "tmdb_region": st.session_state.tmdb_region,
+        "tmdb_vote_count_gte": st.session_state.tmdb_vote_count_gte,
+        "tmdb_n_items": st.session_state.tmdb_n_items,
+        "tmdb_use_search_fallback": st.session_state.tmdb_use_search_fallback,
+    }
+
+
+def save_inputs_to_query_params(mood: str, weather: str, vibe: str, time_budget: str, extra: str, model: str) -> None:
+    # 새로고침해도 같은 추천을 캐시에서 바로 복원할 수 있도록 URL에 입력값만 남김
+    # 추가 제약은 자유 입력이라 원문 대신 해시만(브라우저 기록/서버 로그에 남지 않게)
+    params = {"m": mood, "w": weather, "v": vibe, "t": time_budget, "mdl": model}
+    extra_key = extra_digest(extra)
+    if extra_key:
+        params["x"] = extra_key
+    st.query_params.from_dict(params)
+
+
+def restore_from_query_params(openai_key: Optional[str], tmdb_key: Optional[str]) -> None:
+    """
+    새로고침 등으로 세션이 비었을 때 URL의 입력값으로 추천 복원
+    - OpenAI 캐시에 있을 때만(없으면 아무것도 안 함, 페이지 로드만으로 OpenAI를 부르지 않음)
+    - 캐시는 세션 공용이고 키와 무관 → OpenAI 키가 없는 방문자에게는 복원하지 않음
+    """
+    if st.session_state.current_payload is not None or not openai_key:
+        return
+    qp = st.query_params
+    mood, weather, vibe, time_budget = qp.get("m"), qp.get("w"), qp.get("v"), qp.get("t")
+    if mood not in MOODS or weather not in WEATHERS or vibe not in VIBES or time_budget not in TIME_BUDGETS:
+        return
+    model = qp.get("mdl") or DEFAULT_MODEL
+
+    cached = get_reco_cache().get(reco_cache_key(model, mood, weather, vibe, time_budget, qp.get("x", "")))
+    if cached is None:
+        return
+    st.session_state.current_payload = cached["payload"]
+    # Discover 결과는 렌더링 때 tmdb_discover 캐시에서 다시 읽음(만료/캐시 비우기 반영)
+    st.session_state.tmdb_prefetch = None
+    st.session_state.current_inputs = build_current_inputs(mood, weather, vibe, time_budget, cached["extra"], model, tmdb_key)
+
+
+def reco_keyword_str(reco: Dict[str, Any]) -> str:
+    keywords = reco.get("tmdb_keywords", [])
+    return ", ".join([k for k in keywords if isinstance(k, str) and k.strip()])
+
+
+def iter_tmdb_for_recos(
+    recos: List[Dict[str, Any]],
+    tmdb_key: str,
     tmdb_content_mode: str,
+    mood: str,
+    vibe: str,
+    weather: str,
     tmdb_language: str,
     tmdb_region: str,
     tmdb_vote_count_gte: int,
     tmdb_n_items: int,
     tmdb_use_search_fallback: bool,
-) -> None:
-    headline = reco_payload.get("headline", "오늘의 추천")
-    tone = reco_payload.get("tone", "기본")
-    recos = reco_payload.get("recommendations", [])
+    discovered: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[Tuple[List[int], List[Dict[str, Any]]]]:
+    """
+    추천 카드별 TMDB 조회를 스레드로 동시에 실행(네트워크 대기 시간을 겹침)
+    - Discover는 카드와 무관하므로 한 번만(미리 받아둔 discovered가 있으면 그대로 사용)
+    - 같은 검색어(예: "힐링")가 여러 카드에 나오면 한 번만 조회
+    - 끝나는 순서대로 (해당 카드 인덱스 목록, 결과)를 내보냄 → 먼저 온 카드부터 채울 수 있음
+    """
+    if not recos:
+        return
 
-    mood_emoji = THEME["mood"].get(mood, {}).get("emoji", "🙂")
-    weather_emoji = THEME["weather"].get(weather, {}).get("emoji", "🌤️")
-    vibe_emoji = THEME["vibe"].get(vibe, {}).get("emoji", "🎯")
-    time_emoji = THEME["time"].get(time_budget, {}).get("emoji", "⏳")
+    if discovered is None:
+        discovered = tmdb_discover_weighted(
+            api_key=tmdb_key,
+            content_mode=tmdb_content_mode,
+            mood=mood,
+            vibe=vibe,
+            weather=weather,
+            language=tmdb_language,
+            region=tmdb_region,
+            vote_count_gte=tmdb_vote_count_gte,
+            n_items=tmdb_n_items,
+        )
+
+    queries = [reco_keyword_str(r) or r.get("title", f"추천 {i}") for i, r in enumerate(recos, start=1)]
+    unique_qs = {q.strip().lower(): q for q in queries}
+    positions: Dict[str, List[int]] = {}
+    for idx, q in enumerate(queries):
+        positions.setdefault(q.strip().lower(), []).append(idx)
+
+    def fetch(query: str) -> List[Dict[str, Any]]:
+        return tmdb_get_recommendations_weighted(
+            api_key=tmdb_key,
+            content_mode=tmdb_content_mode,
+            mood=mood,
+            vibe=vibe,
+            weather=weather,
+            fallback_query=query,
+            language=tmdb_language,
+            region=tmdb_region,
+            vote_count_gte=tmdb_vote_count_gte,
+            n_items=tmdb_n_items,
+            use_search_fallback=tmdb_use_search_fallback,
+            discovered=discovered,
+        )
 
-    st.markdown(
-        f"""
+    with ThreadPoolExecutor(max_workers=min(TMDB_MAX_WORKERS, len(unique_qs))) as ex:
+        futures = {ex.submit(fetch, q): norm for norm, q in unique_qs.items()}
+        for f in as_completed(futures):
+            yield positions[futures[f]], f.result()
+
+
+# 카드/헤더 HTML 틀은 한 번만 만들고 렌더링 때는 값만 채움
+_HEADER_TEMPLATE = string.Template(
+    """
 <div style="display:flex; align-items:center; gap:10px; margin: 10px 0 6px 0;">
-  <div style="font-size: 1.7rem;">{mood_emoji}</div>
+  <div style="font-size: 1.7rem;">$mood_emoji</div>
   <div>
-    <div style="font-size: 1.25rem; font-weight: 800;">{headline}</div>
-    <div style="color: rgba(0,0,0,0.65);">톤: {tone}</div>
+    <div style="font-size: 1.25rem; font-weight: 800;">$headline</div>
+    <div style="color: rgba(0,0,0,0.65);">톤: $tone</div>
   </div>
 </div>
 
 <div style="margin: 6px 0 14px 0;">
-  <span class="moodpick-chip">{mood_emoji} {mood}</span>
-  <span class="moodpick-chip">{weather_emoji} {weather}</span>
-  <span class="moodpick-chip">{vibe_emoji} {vibe}</span>
-  <span class="moodpick-chip">{time_emoji} {time_budget}</span>
+  <span class="moodpick-chip">$mood_emoji $mood</span>
+  <span class="moodpick-chip">$weather_emoji $weather</span>
+  <span class="moodpick-chip">$vibe_emoji $vibe</span>
+  <span class="moodpick-chip">$time_emoji $time_budget</span>
 </div>
-""",
-        unsafe_allow_html=True,
-    )
-
-    for i, r in enumerate(recos, start=1):
-        title = r.get("title", f"추천 {i}")
-        one_liner = r.get("one_liner", "")
-        reason = r.get("reason", "")
-        how_to = r.get("how_to_start", [])
-        keywords = r.get("tmdb_keywords", [])
-
-        steps_html = "".join([f"<li>{step}</li>" for step in how_to]) if how_to else "<li>바로 해보기</li>"
-        keyword_str = ", ".join([k for k in keywords if isinstance(k, str) and k.strip()])
+"""
+)
 
-        st.markdown(
-            f"""
+_CARD_TEMPLATE = string.Template(
+    """
 <div class="moodpick-card">
-  <div class="moodpick-title">{i}. {title}</div>
-  <div class="moodpick-sub">{one_liner}</div>
-  <div class="moodpick-reason"><b>왜 좋아요?</b> {reason}</div>
+  <div class="moodpick-title">$i. $title</div>
+  <div class="moodpick-sub">$one_liner</div>
+  <div class="moodpick-reason"><b>왜 좋아요?</b> $reason</div>
   <div><b>바로 시작하기</b>
     <ol style="margin-top:6px; margin-bottom:0;">
-      {steps_html}
+      $steps_html
     </ol>
   </div>
   <div class="tmdb-row">
     <div style="font-weight:700; margin-bottom:6px;">
-      🎬 함께 보기({ "영화" if tmdb_content_mode=="movie" else ("TV" if tmdb_content_mode=="tv" else "영화/TV") })
-      — 키워드: {keyword_str if keyword_str else "없음"}
+      🎬 함께 보기($content_label)
+      — 키워드: $keywords
     </div>
+  </div>
 </div>
-""",
-            unsafe_allow_html=True,
+"""
+)
+
+_CONTENT_MODE_LABEL = {"movie": "영화", "tv": "TV", "both": "영화/TV"}
+
+
+def _render_digest(*parts: Any) -> bytes:
+    return hashlib.blake2b(_json_dumps_line(parts), digest_size=16).digest()
+
+
+def render_reco_cards(
+    reco_payload: Dict[str, Any],
+    mood: str,
+    weather: str,
+    vibe: str,
+    time_budget: str,
+    tmdb_key: Optional[str],
+    tmdb_content_mode: str,
+    tmdb_language: str,
+    tmdb_region: str,
+    tmdb_vote_count_gte: int,
+    tmdb_n_items: int,
+    tmdb_use_search_fallback: bool,
+    with_tmdb: bool = True,
+    tmdb_discovered: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    headline = reco_payload.get("headline", "오늘의 추천")
+    tone = reco_payload.get("tone", "기본")
+    recos = reco_payload.get("recommendations", [])
+
+    mood_emoji = _MOOD_EMOJI.get(mood, "🙂")
+    weather_emoji = _WEATHER_EMOJI.get(weather, "🌤️")
+    vibe_emoji = _VIBE_EMOJI.get(vibe, "🎯")
+    time_emoji = _TIME_EMOJI.get(time_budget, "⏳")
+
+    # 연속된 HTML(헤더/카드)은 모아서 st.markdown 한 번으로 출력
+    # TMDB 자리/안내처럼 다른 요소를 넣어야 할 때만 그 앞까지 내보냄
+    pending = [
+        _HEADER_TEMPLATE.substitute(
+            mood_emoji=mood_emoji,
+            headline=html.escape(headline),
+            tone=html.escape(tone),
+            mood=mood,
+            weather_emoji=weather_emoji,
+            weather=weather,
+            vibe_emoji=vibe_emoji,
+            vibe=vibe,
+            time_emoji=time_emoji,
+            time_budget=time_budget,
+        )
+    ]
+
+    def flush() -> None:
+        if pending:
+            st.markdown("\n".join(pending), unsafe_allow_html=True)
+            pending.clear()
+
+    content_label = _CONTENT_MODE_LABEL.get(tmdb_content_mode, "영화/TV")
+    tmdb_slots = []
+    for i, r in enumerate(recos, start=1):
+        title = r.get("title", f"추천 {i}")
+        one_liner = r.get("one_liner", "")
+        reason = r.get("reason", "")
+        how_to = r.get("how_to_start", [])
+
+        # LLM 출력은 HTML로 그대로 넣지 않고 한 번만 escape
+        steps_html = "".join(f"<li>{html.escape(step)}</li>" for step in how_to) if how_to else "<li>바로 해보기</li>"
+        keyword_str = reco_keyword_str(r)
+
+        pending.append(
+            _CARD_TEMPLATE.substitute(
+                i=i,
+                title=html.escape(title),
+                one_liner=html.escape(one_liner),
+                reason=html.escape(reason),
+                steps_html=steps_html,
+                content_label=content_label,
+                keywords=html.escape(keyword_str) if keyword_str else "없음",
+            )
         )
 
+        if not with_tmdb:
+            continue
+
+        flush()
         if not tmdb_key:
             st.info("TMDB API Key가 없어서 영화/TV 추천을 표시할 수 없어요. 사이드바에 TMDB 키를 입력해 주세요.")
             continue
 
-        fallback_q = keyword_str if keyword_str else title
-        items = tmdb_get_recommendations_weighted(
-            api_key=tmdb_key,
-            content_mode=tmdb_content_mode,
-            mood=mood,
-            vibe=vibe,
-            weather=weather,
-            fallback_query=fallback_q,
-            language=tmdb_language,
-            region=tmdb_region,
-            vote_count_gte=tmdb_vote_count_gte,
-            n_items=tmdb_n_items,
-            use_search_fallback=tmdb_use_search_fallback,
+        # 카드 텍스트는 바로 보여주고, TMDB 결과 자리만 잡아둠
+        slot = st.empty()
+        slot.caption("🎬 TMDB에서 불러오는 중…")
+        tmdb_slots.append(slot)
+
+    flush()
+    if not tmdb_slots:
+        return
+
+    # 저장 버튼 등으로 rerun만 일어났고 추천/TMDB 설정이 그대로면 지난번 결과를 그대로 다시 그림
+    # 추천 본문 전체를 들고 있지 않도록 짧은 digest로 비교
+    render_key = _render_digest(
+        reco_payload,
+        tmdb_key,
+        tmdb_content_mode,
+        mood,
+        vibe,
+        weather,
+        tmdb_language,
+        tmdb_region,
+        tmdb_vote_count_gte,
+        tmdb_n_items,
+        tmdb_use_search_fallback,
+    )
+    last = st.session_state.get("tmdb_last_render")
+    if last and last["key"] == render_key:
+        for idx, slot in enumerate(tmdb_slots):
+            with slot.container():
+                render_tmdb_items(last["items"][idx], priority=idx == 0)
+        return
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in tmdb_slots]
+    for idxs, items in iter_tmdb_for_recos(
+        recos,
+        tmdb_key=tmdb_key,
+        tmdb_content_mode=tmdb_content_mode,
+        mood=mood,
+        vibe=vibe,
+        weather=weather,
+        tmdb_language=tmdb_language,
+        tmdb_region=tmdb_region,
+        tmdb_vote_count_gte=tmdb_vote_count_gte,
+        tmdb_n_items=tmdb_n_items,
+        tmdb_use_search_fallback=tmdb_use_search_fallback,
+        discovered=tmdb_discovered,
+    ):
+        for idx in idxs:
+            results[idx] = items
+            with tmdb_slots[idx].container():
+                render_tmdb_items(items, priority=idx == 0)
+
+    # 전부 실패한 결과는 남기지 않음 → 다음 rerun에서 다시 시도
+    if any(results):
+        st.session_state.tmdb_last_render = {"key": render_key, "items": results}
+
+
+def select_history_entry(item: Dict[str, Any]) -> None:
+    # 버튼 콜백 — 다시 그리기 전에 실행되므로 같은 rerun에서 결과 영역이 바로 바뀜
+    st.session_state.current_payload = item.get("payload")
+    st.session_state.current_inputs = item.get("inputs")
+
+
+def clear_history_clicked() -> None:
+    # 버튼 콜백 안에서 그린 요소는 rerun 때 사라짐 → 플래그만 남기고 안내는 다음 렌더링에서 표시
+    clear_history()
+    st.session_state.history_cleared = True
+
+
+def render_history_sidebar() -> None:
+    """
+    사이드바 히스토리 목록
+    - 항목 선택/전체 삭제 모두 on_click 콜백 → 클릭 한 번에 앱 rerun 한 번
+    - 항목을 고르면 결과 영역도 바뀌어야 하므로 프래그먼트로 나누지 않음
+      (전체 삭제만 프래그먼트에 넣으면 바깥 목록이 다음 rerun까지 그대로 남음)
+    """
+    st.markdown("### 저장된 히스토리")
+    history = load_history()
+
+    if not history:
+        st.caption("아직 저장된 추천이 없어요.")
+    else:
+        for idx, item in enumerate(history[:20]):
+            ts = item.get("saved_at", "")
+            inp = item.get("inputs", {})
+            label = f"{ts} | {inp.get('mood','')} / {inp.get('weather','')} / {inp.get('vibe','')}"
+            st.button(label, key=f"hist_{idx}", use_container_width=True, on_click=select_history_entry, args=(item,))
+
+    st.markdown("---")
+    # 콜백은 다시 그리기 전에 실행되므로 같은 rerun에서 빈 목록이 보임
+    st.button("히스토리 전체 삭제", use_container_width=True, on_click=clear_history_clicked)
+    if st.session_state.pop("history_cleared", False):
+        st.success("히스토리를 삭제했어요.")
+
+
+def render_tmdb_settings() -> None:
+    # 결과 프래그먼트 안에서 그림 → 설정을 바꾸면 앱 전체가 아니라 결과 영역만 다시 실행
+    with st.expander("🎛️ 영화/TV 추천 설정", expanded=False):
+        # 토글(라디오)
+        st.session_state.tmdb_content_mode = st.radio(
+            "콘텐츠 타입",
+            options=TMDB_CONTENT_MODES,
+            format_func=TMDB_CONTENT_MODE_LABELS.get,
+            index=_TMDB_CONTENT_MODE_INDEX[st.session_state.tmdb_content_mode],
+            horizontal=False,
+        )
+
+        st.session_state.tmdb_language = st.selectbox(
+            "언어",
+            options=TMDB_LANGUAGES,
+            index=_TMDB_LANGUAGE_INDEX[st.session_state.tmdb_language],
+            help="ko-KR 추천. 검색 fallback은 자동으로 en-US도 한번 더 시도할 수 있어요.",
+        )
+
+        st.session_state.tmdb_region = st.selectbox(
+            "지역(영화용)",
+            options=TMDB_REGIONS,
+            index=_TMDB_REGION_INDEX[st.session_state.tmdb_region],
+            help="Discover(movie)에서 region에 영향을 줄 수 있어요.",
+        )
+
+        st.session_state.tmdb_n_items = st.slider(
+            "추천 개수(카드당)",
+            min_value=1,
+            max_value=6,
+            value=int(st.session_state.tmdb_n_items),
+            step=1,
+        )
+
+        st.session_state.tmdb_vote_count_gte = st.slider(
+            "최소 평점 참여 수(인기/안정성)",
+            min_value=0,
+            max_value=2000,
+            value=int(st.session_state.tmdb_vote_count_gte),
+            step=50,
+            help="낮출수록 더 많이 나오고, 높일수록 유명작 위주로 나와요.",
+        )
+
+        st.session_state.tmdb_use_search_fallback = st.checkbox(
+            "검색 fallback 사용(Discover 부족할 때 검색으로 보완)",
+            value=bool(st.session_state.tmdb_use_search_fallback),
         )
-        render_tmdb_items(items)
+
+
+@st.fragment
+def render_current_results(
+    tmdb_key: Optional[str],
+    mood: str,
+    weather: str,
+    vibe: str,
+    time_budget: str,
+) -> None:
+    """
+    - 결과 영역만 프래그먼트로 분리, TMDB 설정 위젯도 이 안에 있음
+      → 설정을 바꾸면 결과 영역(TMDB 목록)만 다시 그림
+    - 표시 내용은 session_state의 current_payload/current_inputs 기준
+    """
+    render_tmdb_settings()
+
+    if st.session_state.current_payload is None:
+        st.info("왼쪽에서 기분/날씨/분위기/시간을 고르고 **추천 받기**를 눌러주세요.")
+        return
+
+    inp = st.session_state.current_inputs or {}
+    shown_mood = inp.get("mood", mood)
+    shown_weather = inp.get("weather", weather)
+    shown_vibe = inp.get("vibe", vibe)
+
+    # 추천 받을 때 미리 받아둔 Discover 결과는 설정이 그대로일 때만 재사용
+    prefetched = st.session_state.tmdb_prefetch
+    discovered = None
+    if prefetched and prefetched["args"] == tmdb_discover_args(shown_mood, shown_vibe, shown_weather):
+        discovered = prefetched["items"]
+
+    render_reco_cards(
+        st.session_state.current_payload,
+        shown_mood,
+        shown_weather,
+        shown_vibe,
+        inp.get("time_budget", time_budget),
+        tmdb_key=tmdb_key,
+        tmdb_content_mode=st.session_state.tmdb_content_mode,
+        tmdb_language=st.session_state.tmdb_language,
+        tmdb_region=st.session_state.tmdb_region,
+        tmdb_vote_count_gte=int(st.session_state.tmdb_vote_count_gte),
+        tmdb_n_items=int(st.session_state.tmdb_n_items),
+        tmdb_use_search_fallback=bool(st.session_state.tmdb_use_search_fallback),
+        tmdb_discovered=discovered,
+    )
 
 
 # =========================
@@ -637,34 +1679,27 @@ def render_reco_cards(
 # =========================
 st.set_page_config(page_title=APP_NAME, page_icon="✨", layout="wide")
 
-for k in [
-    "current_payload",
-    "current_inputs",
-    "openai_key",
-    "tmdb_key",
-    "tmdb_content_mode",
-    "tmdb_language",
-    "tmdb_region",
-    "tmdb_vote_count_gte",
-    "tmdb_n_items",
-    "tmdb_use_search_fallback",
-]:
-    if k not in st.session_state:
-        st.session_state[k] = None
-
-# Defaults for TMDB options
-if st.session_state.tmdb_content_mode is None:
-    st.session_state.tmdb_content_mode = "both"  # movie | tv | both
-if st.session_state.tmdb_language is None:
-    st.session_state.tmdb_language = "ko-KR"
-if st.session_state.tmdb_region is None:
-    st.session_state.tmdb_region = "KR"
-if st.session_state.tmdb_vote_count_gte is None:
-    st.session_state.tmdb_vote_count_gte = 150
-if st.session_state.tmdb_n_items is None:
-    st.session_state.tmdb_n_items = 3
-if st.session_state.tmdb_use_search_fallback is None:
-    st.session_state.tmdb_use_search_fallback = True
+# 세션 상태 기본값(TMDB 옵션 기본값 포함)
+SESSION_DEFAULTS: Dict[str, Any] = {
+    "current_payload": None,
+    "current_inputs": None,
+    "openai_key": None,
+    "tmdb_key": None,
+    "tmdb_content_mode": "both",  # movie | tv | both
+    "tmdb_language": "ko-KR",
+    "tmdb_region": "KR",
+    "tmdb_vote_count_gte": 150,
+    "tmdb_n_items": 3,
+    "tmdb_use_search_fallback": True,
+    "tmdb_prefetch": None,
+    "tmdb_last_render": None,
+}
+
+# 세션당 한 번만 채움(rerun마다 키를 하나씩 확인하지 않음)
+if "session_initialized" not in st.session_state:
+    for k, v in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(k, v)  # 이미 들어 있는 값은 유지
+    st.session_state.session_initialized = True
 
 # Sidebar
 with st.sidebar:
@@ -688,143 +1723,124 @@ with st.sidebar:
     if tmdb_key_input.strip():
         st.session_state.tmdb_key = tmdb_key_input.strip()
 
-    st.caption(f"OpenAI Key: {'✅' if get_openai_key() else '❌'}")
-    st.caption(f"TMDB Key: {'✅' if get_tmdb_key() else '❌'}")
+    # 키 조회(secrets → env → session)는 rerun당 한 번만
+    openai_key = get_openai_key()
+    tmdb_key = get_tmdb_key()
 
-    st.markdown("---")
-    model = st.text_input("모델", value=DEFAULT_MODEL, help="Structured Outputs 지원 모델 권장")
+    st.caption(f"OpenAI Key: {'✅' if openai_key else '❌'}")
+    st.caption(f"TMDB Key: {'✅' if tmdb_key else '❌'}")
 
     st.markdown("---")
-    st.subheader("🎛️ 영화/TV 추천 설정")
-
-    # 토글(라디오)
-    st.session_state.tmdb_content_mode = st.radio(
-        "콘텐츠 타입",
-        options=["both", "movie", "tv"],
-        format_func=lambda x: "영화/TV 둘 다" if x == "both" else ("영화" if x == "movie" else "TV"),
-        index=["both", "movie", "tv"].index(st.session_state.tmdb_content_mode),
-        horizontal=False,
-    )
-
-    st.session_state.tmdb_language = st.selectbox(
-        "언어",
-        options=["ko-KR", "en-US", "ja-JP"],
-        index=["ko-KR", "en-US", "ja-JP"].index(st.session_state.tmdb_language),
-        help="ko-KR 추천. 검색 fallback은 자동으로 en-US도 한번 더 시도할 수 있어요.",
-    )
-
-    st.session_state.tmdb_region = st.selectbox(
-        "지역(영화용)",
-        options=["KR", "US", "JP"],
-        index=["KR", "US", "JP"].index(st.session_state.tmdb_region),
-        help="Discover(movie)에서 region에 영향을 줄 수 있어요.",
-    )
-
-    st.session_state.tmdb_n_items = st.slider(
-        "추천 개수(카드당)",
-        min_value=1,
-        max_value=6,
-        value=int(st.session_state.tmdb_n_items),
-        step=1,
-    )
-
-    st.session_state.tmdb_vote_count_gte = st.slider(
-        "최소 평점 참여 수(인기/안정성)",
-        min_value=0,
-        max_value=2000,
-        value=int(st.session_state.tmdb_vote_count_gte),
-        step=50,
-        help="낮출수록 더 많이 나오고, 높일수록 유명작 위주로 나와요.",
-    )
-
-    st.session_state.tmdb_use_search_fallback = st.checkbox(
-        "검색 fallback 사용(Discover 부족할 때 검색으로 보완)",
-        value=bool(st.session_state.tmdb_use_search_fallback),
-    )
+    model = st.text_input("모델", value=DEFAULT_MODEL, help="Structured Outputs 지원 모델 권장")
 
     st.markdown("---")
-    st.markdown("### 저장된 히스토리")
-    history = load_history()
-
-    if not history:
-        st.caption("아직 저장된 추천이 없어요.")
-    else:
-        for idx, item in enumerate(history[:20]):
-            ts = item.get("saved_at", "")
-            inp = item.get("inputs", {})
-            label = f"{ts} | {inp.get('mood','')} / {inp.get('weather','')} / {inp.get('vibe','')}"
-            if st.button(label, key=f"hist_{idx}", use_container_width=True):
-                st.session_state.current_payload = item.get("payload")
-                st.session_state.current_inputs = item.get("inputs")
+    if st.button("TMDB 캐시 비우기", use_container_width=True):
+        clear_tmdb_caches()
+        st.success("TMDB 캐시를 비웠어요.")
 
     st.markdown("---")
-    if st.button("히스토리 전체 삭제", use_container_width=True):
-        save_history([])
-        st.success("히스토리를 삭제했어요. 새로고침하면 목록이 비어요.")
+    render_history_sidebar()
 
+restore_from_query_params(openai_key, tmdb_key)
 
 # Main UI
 col_left, col_right = st.columns([1.0, 1.2], gap="large")
 
+with col_right:
+    st.markdown("## 추천 결과")
+    # 스트리밍 중 완성된 카드를 먼저 보여주는 자리
+    stream_area = st.empty()
+
 with col_left:
     st.markdown("# 오늘 어떤 기분인가요?")
 
-    mood = st.radio("기분", MOODS, horizontal=True)
-    weather = st.radio("날씨", WEATHERS, horizontal=True)
-    vibe = st.radio("분위기", VIBES, horizontal=True)
-    time_budget = st.radio("시간", TIME_BUDGETS, horizontal=True)
+    # 폼으로 묶어서 라디오를 바꿀 때마다 rerun되지 않고 "추천 받기" 때 한 번만 실행
+    with st.form("moodpick_inputs", clear_on_submit=False, border=False):
+        mood = st.radio("기분", MOODS, horizontal=True)
+        weather = st.radio("날씨", WEATHERS, horizontal=True)
+        vibe = st.radio("분위기", VIBES, horizontal=True)
+        time_budget = st.radio("시간", TIME_BUDGETS, horizontal=True)
+
+        extra = st.text_area(
+            "추가 제약(선택)",
+            placeholder="예: 예산 1만원 이하 / 집 근처에서 / 너무 활동적인 건 싫어요 / 조용한 곳 선호",
+            height=100,
+        )
 
-    extra = st.text_area(
-        "추가 제약(선택)",
-        placeholder="예: 예산 1만원 이하 / 집 근처에서 / 너무 활동적인 건 싫어요 / 조용한 곳 선호",
-        height=100,
-    )
+        form_cols = st.columns([1, 1])
+        with form_cols[0]:
+            go = st.form_submit_button("✨ 추천 받기", use_container_width=True)
+        with form_cols[1]:
+            # "다시 추천"도 폼 제출 버튼 → 방금 바꾼 선택값으로 다시 추천(폼 밖 버튼은 마지막 제출값을 씀)
+            reroll = st.form_submit_button("🔄 다시 추천", use_container_width=True)
 
-    accent = THEME["mood"].get(mood, {}).get("accent", "#6B7280")
+    accent = _MOOD_ACCENT.get(mood, "#6B7280")
     apply_dynamic_style(accent)
 
-    btn_cols = st.columns([1, 1, 1])
-    with btn_cols[0]:
-        go = st.button("✨ 추천 받기", use_container_width=True)
-    with btn_cols[1]:
-        reroll = st.button("🔄 다시 추천", use_container_width=True)
-    with btn_cols[2]:
-        save_btn = st.button("💾 저장하기", use_container_width=True, disabled=st.session_state.current_payload is None)
+    save_btn = st.button("💾 저장하기", use_container_width=True, disabled=st.session_state.current_payload is None)
 
     if go or reroll:
-        openai_key = ensure_openai_key_or_stop()
+        openai_key = ensure_openai_key_or_stop(openai_key)
+
+        def show_partial(partial: Dict[str, Any]) -> None:
+            with stream_area.container():
+                render_reco_cards(
+                    partial,
+                    mood,
+                    weather,
+                    vibe,
+                    time_budget,
+                    tmdb_key=None,
+                    tmdb_content_mode=st.session_state.tmdb_content_mode,
+                    tmdb_language=st.session_state.tmdb_language,
+                    tmdb_region=st.session_state.tmdb_region,
+                    tmdb_vote_count_gte=int(st.session_state.tmdb_vote_count_gte),
+                    tmdb_n_items=int(st.session_state.tmdb_n_items),
+                    tmdb_use_search_fallback=bool(st.session_state.tmdb_use_search_fallback),
+                    with_tmdb=False,
+                )
 
-        with st.spinner("추천을 만드는 중..."):
-            try:
-                payload = call_openai_recommendations(
-                    api_key=openai_key,
-                    model=model,
-                    mood=mood,
-                    weather=weather,
-                    vibe=vibe,
-                    time_budget=time_budget,
-                    extra_constraints=extra,
+        cache_key = reco_cache_key(model, mood, weather, vibe, time_budget, extra_digest(extra))
+        # "다시 추천"은 일부러 캐시를 건너뛰고 새로 생성
+        cached = None if reroll else get_reco_cache().get(cache_key)
+        if cached is not None:
+            # 추천 캐시에는 LLM 결과만 저장 — Discover는 렌더링 때 tmdb_discover 캐시(6시간 구간, 캐시 비우기 반영)에서 다시 읽음
+            payload = cached["payload"]
+            st.session_state.tmdb_prefetch = None
+        else:
+            discover_args = tmdb_discover_args(mood, vibe, weather)
+            with ThreadPoolExecutor(max_workers=1) as prefetch_ex:
+                # TMDB Discover는 LLM 응답과 무관 → OpenAI 스트리밍 동안 미리 받아둠
+                prefetch = prefetch_ex.submit(tmdb_discover_weighted, api_key=tmdb_key, **discover_args) if tmdb_key else None
+
+                with st.spinner("추천을 만드는 중..."):
+                    try:
+                        payload = call_openai_recommendations(
+                            api_key=openai_key,
+                            model=model,
+                            mood=mood,
+                            weather=weather,
+                            vibe=vibe,
+                            time_budget=time_budget,
+                            extra_constraints=extra,
+                            on_partial=show_partial,
+                            temperature=REROLL_TEMPERATURE if reroll else None,
+                        )
+                    except Exception as e:
+                        stream_area.empty()
+                        st.error(f"OpenAI 호출에 실패했어요: {e}")
+                        st.stop()
+                stream_area.empty()
+
+                st.session_state.tmdb_prefetch = (
+                    {"args": discover_args, "items": prefetch.result()} if prefetch else None
                 )
-            except Exception as e:
-                st.error(f"OpenAI 호출에 실패했어요: {e}")
-                st.stop()
+            # URL에는 추가 제약 해시만 남으므로 복원용 원문은 서버 캐시에만 보관
+            get_reco_cache().set(cache_key, {"payload": payload, "extra": extra})
 
         st.session_state.current_payload = payload
-        st.session_state.current_inputs = {
-            "mood": mood,
-            "weather": weather,
-            "vibe": vibe,
-            "time_budget": time_budget,
-            "extra_constraints": extra,
-            "model": model,
-            "tmdb_enabled": bool(get_tmdb_key()),
-            "tmdb_content_mode": st.session_state.tmdb_content_mode,
-            "tmdb_language": st.session_state.tmdb_language,
-            "tmdb_region": st.session_state.tmdb_region,
-            "tmdb_vote_count_gte": st.session_state.tmdb_vote_count_gte,
-            "tmdb_n_items": st.session_state.tmdb_n_items,
-            "tmdb_use_search_fallback": st.session_state.tmdb_use_search_fallback,
-        }
+        st.session_state.current_inputs = build_current_inputs(mood, weather, vibe, time_budget, extra, model, tmdb_key)
+        save_inputs_to_query_params(mood, weather, vibe, time_budget, extra, model)
 
     if save_btn and st.session_state.current_payload and st.session_state.current_inputs:
         entry = {
@@ -836,25 +1852,7 @@ with col_left:
         st.success("저장했어요! (사이드바 히스토리에서 다시 볼 수 있어요)")
 
 with col_right:
-    st.markdown("## 추천 결과")
-    if st.session_state.current_payload is None:
-        st.info("왼쪽에서 기분/날씨/분위기/시간을 고르고 **추천 받기**를 눌러주세요.")
-    else:
-        inp = st.session_state.current_inputs or {}
-        render_reco_cards(
-            st.session_state.current_payload,
-            inp.get("mood", mood),
-            inp.get("weather", weather),
-            inp.get("vibe", vibe),
-            inp.get("time_budget", time_budget),
-            tmdb_key=get_tmdb_key(),
-            tmdb_content_mode=st.session_state.tmdb_content_mode,
-            tmdb_language=st.session_state.tmdb_language,
-            tmdb_region=st.session_state.tmdb_region,
-            tmdb_vote_count_gte=int(st.session_state.tmdb_vote_count_gte),
-            tmdb_n_items=int(st.session_state.tmdb_n_items),
-            tmdb_use_search_fallback=bool(st.session_state.tmdb_use_search_fallback),
-        )
+    render_current_results(tmdb_key, mood, weather, vibe, time_budget)
 
 st.markdown("---")
 st.caption(